@@ -7,19 +7,42 @@ Flask ベースのモダンなUIアプリケーション
 
 from flask import Flask, render_template, request, jsonify, send_file, Response
 import csv
+import copy
+import gzip
+import hashlib
 import json
 import subprocess
 import time
 import os
 import threading
 import queue
+from concurrent.futures import ThreadPoolExecutor
+import shlex
 from datetime import datetime
 from pathlib import Path
 import urllib.parse
 import io
+import uuid
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from flask_compress import Compress
+except ImportError:
+    Compress = None
 
 app = Flask(__name__)
 app.config['JSON_AS_ASCII'] = False
+if Compress is not None:
+    Compress(app)
 
 # ベースディレクトリ
 BASE_DIR = Path(__file__).parent
@@ -27,6 +50,14 @@ CONFIG_PATH = BASE_DIR / "config.json"
 CSV_PATH = BASE_DIR / "contacts.csv"
 LOG_DIR = BASE_DIR / "logs"
 
+# ログディレクトリは起動時に1度だけ作成（WSGI 経由で __main__ を通らない場合も含む）
+LOG_DIR.mkdir(exist_ok=True)
+
+# このサイズを超えるCSVは pandas（インストール済みの場合）で読み込む
+PANDAS_CSV_THRESHOLD = 1024 * 1024
+# インポートは1行ごとのPython処理が重いため、より小さいサイズから pandas を使う
+PANDAS_IMPORT_THRESHOLD = 256 * 1024
+
 # 送信状態を管理
 send_status = {
     "is_running": False,
@@ -35,24 +66,113 @@ send_status = {
     "results": [],
     "start_time": None
 }
+# send_status の件数・結果を更新／参照するときのロック
+send_status_lock = threading.Lock()
+
+# ログキュー（リアルタイム表示用）。SSEクライアントがいなくても溜まり続けないよう上限を設ける
+LOG_QUEUE_SIZE = 1024
+log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+
+# 送信中にメモリ上に保持する結果の件数（それより古い結果はログファイルにのみ残る）
+RESULTS_LIMIT = 500
+
+# 設定キャッシュ（config.json の mtime が変わるまで再パースしない）
+_config_cache = {"mtime": 0, "data": None}
+_config_lock = threading.Lock()
+
+# contacts.csv の列。uuid は連絡先の固定ID（削除しても他の連絡先のIDは変わらない）
+CONTACT_FIELDS = ['phone', 'name', 'message', 'enabled', 'uuid']
+
+# 連絡先キャッシュ（contacts.csv の mtime が変わるまで再パースしない）
+_contacts_cache = {"mtime": -1, "data": []}
+_contacts_lock = threading.Lock()
+
+
+def put_log(entry):
+    """ログキューに追加（満杯なら最も古いものを捨てる）"""
+    while True:
+        try:
+            log_queue.put_nowait(entry)
+            return
+        except queue.Full:
+            try:
+                log_queue.get_nowait()
+            except queue.Empty:
+                pass
+
+
+def _dumps(obj):
+    """JSON文字列に変換（orjson があれば使う）"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def _loads(text):
+    """JSON文字列を読み込む（orjson があれば使う）"""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
 
-# ログキュー（リアルタイム表示用）
-log_queue = queue.Queue()
+
+# flask_compress は圧縮時に強い ETag を "<etag>:<圧縮方式>" に書き換える
+COMPRESS_ALGORITHMS = ('gzip', 'deflate', 'br', 'zstd')
+
+
+def etag_matches(etag):
+    """If-None-Match が ETag（圧縮方式付きを含む）と一致するか"""
+    if request.if_none_match.contains(etag):
+        return True
+    return any(request.if_none_match.contains(f"{etag}:{algo}") for algo in COMPRESS_ALGORITHMS)
+
+
+def conditional_json(etag, build):
+    """ETag 付きで JSON を返す（If-None-Match が一致すれば本文なしの 304）
+
+    build は 304 にならなかった場合だけ呼ばれ、返す値を作る。
+    flask_compress がない場合は gzip 圧縮もここで行う。
+    """
+    if etag and etag_matches(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(build())
+        if Compress is None and request.accept_encodings['gzip'] and len(response.get_data()) > 500:
+            response.set_data(gzip.compress(response.get_data()))
+            response.headers['Content-Encoding'] = 'gzip'
+    if Compress is None:
+        # 圧縮するかどうかは Accept-Encoding で変わる
+        response.vary.add('Accept-Encoding')
+    if etag:
+        response.set_etag(etag)
+    # キャッシュを使う前に毎回 ETag で確認させる
+    response.cache_control.no_cache = True
+    return response
+
+
+def _apply_config_defaults(config):
+    """設定にデフォルト値を追加"""
+    config.setdefault('send_method', 'tap')
+    config.setdefault('send_button_x', 980)
+    config.setdefault('send_button_y', 1850)
+    config.setdefault('max_send_count', 0)  # 0 = unlimited
+    config.setdefault('daily_sent_count', 0)
+    config.setdefault('daily_sent_date', '')
+    return config
 
 
 def load_config():
-    """設定ファイルを読み込む"""
-    if CONFIG_PATH.exists():
-        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            # デフォルト値を追加
-            config.setdefault('send_method', 'tap')
-            config.setdefault('send_button_x', 980)
-            config.setdefault('send_button_y', 1850)
-            config.setdefault('max_send_count', 0)  # 0 = unlimited
-            config.setdefault('daily_sent_count', 0)
-            config.setdefault('daily_sent_date', '')
-            return config
+    """設定ファイルを読み込む（mtimeが同じならキャッシュを返す）"""
+    try:
+        st = CONFIG_PATH.stat()
+    except FileNotFoundError:
+        st = None
+    if st is not None:
+        with _config_lock:
+            if st.st_mtime_ns != _config_cache["mtime"] or _config_cache["data"] is None:
+                with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
+                    _config_cache["data"] = _apply_config_defaults(json.load(f))
+                _config_cache["mtime"] = st.st_mtime_ns
+            return copy.copy(_config_cache["data"])
     return {
         "default_message": "This is a reminder message.",
         "adb_path": "C:\\platform-tools\\adb.exe",
@@ -71,52 +191,130 @@ def load_config():
 
 def save_config(config):
     """設定ファイルを保存"""
-    with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-        json.dump(config, f, ensure_ascii=False, indent=4)
+    with _config_lock:
+        with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
+            json.dump(config, f, ensure_ascii=False, indent=4)
+        # 書き込んだ内容でキャッシュを更新（次回の読み込みでディスクを読まない）
+        _config_cache["data"] = _apply_config_defaults(copy.copy(config))
+        _config_cache["mtime"] = CONFIG_PATH.stat().st_mtime_ns
 
 
-def load_contacts():
-    """CSVから連絡先を読み込む"""
-    contacts = []
-    if CSV_PATH.exists():
-        with open(CSV_PATH, 'r', encoding='utf-8') as f:
-            lines = [l for l in f if not l.startswith('#')]
-            reader = csv.DictReader(lines)
-            for i, row in enumerate(reader):
-                contacts.append({
-                    'id': i,
-                    'phone': row.get('phone', '').strip(),
-                    'name': row.get('name', '').strip(),
-                    'message': row.get('message', '').strip(),
-                    'enabled': row.get('enabled', '1').strip() == '1'
-                })
+def _new_contact_id():
+    """連絡先の新しいIDを発行"""
+    return uuid.uuid4().hex
+
+
+def _parse_contact_row(row):
+    """CSVの1行を連絡先dictに変換（uuid がない行には新しいIDを振る）"""
+    return {
+        'id': (row.get('uuid') or '').strip() or _new_contact_id(),
+        'phone': row.get('phone', '').strip(),
+        'name': row.get('name', '').strip(),
+        'message': row.get('message', '').strip(),
+        'enabled': row.get('enabled', '1').strip() == '1'
+    }
+
+
+def _read_contacts_frame(source):
+    """pandasでCSVを読み込み、連絡先の列に正規化したDataFrameを返す
+
+    ヘッダーが想定外（先頭がコメント行など）または解析できない場合は None を返す。
+    pandas の comment= は行の途中の '#' 以降も切り捨てるため使わず、
+    '#' で始まる行は phone 列で判定して除外する。
+    """
+    try:
+        df = pd.read_csv(source, dtype=str, keep_default_na=False)
+    except Exception:
+        return None
+    if 'phone' not in df.columns:
+        return None
+    df = df[~df['phone'].str.startswith('#')]
+    for col, default in (('name', ''), ('message', ''), ('enabled', '1'), ('uuid', '')):
+        if col not in df.columns:
+            df[col] = default
+    df = df[CONTACT_FIELDS].fillna('')
+    df = df.apply(lambda col: col.str.strip())
+    df['enabled'] = df['enabled'] == '1'
+    return df
+
+
+def _frame_to_contacts(df, keep_ids=True):
+    """DataFrameを連絡先dictのリストに変換（keep_ids=False なら全件に新しいIDを振る）"""
+    contacts = df.to_dict('records')
+    for c in contacts:
+        contact_id = c.pop('uuid')
+        c['id'] = contact_id if keep_ids and contact_id else _new_contact_id()
     return contacts
 
 
-def save_contacts(contacts):
-    """CSVに連絡先を保存"""
+def load_contacts():
+    """CSVから連絡先を読み込む（mtimeが同じならキャッシュを返す）
+
+    uuid 列のない古いCSVは、読み込み時にIDを振ってそのまま保存し直す。
+    """
+    try:
+        st = CSV_PATH.stat()
+    except FileNotFoundError:
+        return []
+    with _contacts_lock:
+        if st.st_mtime_ns != _contacts_cache["mtime"]:
+            df = None
+            if pd is not None and st.st_size > PANDAS_CSV_THRESHOLD:
+                df = _read_contacts_frame(CSV_PATH)
+            if df is not None:
+                missing_ids = bool((df['uuid'] == '').any())
+                contacts = _frame_to_contacts(df)
+            else:
+                contacts = []
+                missing_ids = False
+                with open(CSV_PATH, 'r', encoding='utf-8') as f:
+                    reader = csv.DictReader(l for l in f if not l.startswith('#'))
+                    for row in reader:
+                        missing_ids = missing_ids or not (row.get('uuid') or '').strip()
+                        contacts.append(_parse_contact_row(row))
+            if missing_ids:
+                # 振ったIDを保存しないと次の読み込みでIDが変わってしまう
+                _write_contacts(contacts)
+            else:
+                _contacts_cache["data"] = contacts
+                _contacts_cache["mtime"] = st.st_mtime_ns
+        return [dict(c) for c in _contacts_cache["data"]]
+
+
+def _write_contacts(contacts):
+    """CSVに連絡先を書き込みキャッシュを更新（_contacts_lock を取得した状態で呼ぶ）"""
+    rows = [{
+        'phone': c['phone'],
+        'name': c['name'],
+        'message': c['message'],
+        'enabled': '1' if c.get('enabled', True) else '0',
+        'uuid': c.get('id') or _new_contact_id()
+    } for c in contacts]
     with open(CSV_PATH, 'w', encoding='utf-8', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=['phone', 'name', 'message', 'enabled'])
+        writer = csv.DictWriter(f, fieldnames=CONTACT_FIELDS)
         writer.writeheader()
-        for c in contacts:
-            writer.writerow({
-                'phone': c['phone'],
-                'name': c['name'],
-                'message': c['message'],
-                'enabled': '1' if c.get('enabled', True) else '0'
-            })
+        writer.writerows(rows)
+    # 書き込んだ内容でキャッシュを更新（次回の読み込みで再パースしない）
+    _contacts_cache["data"] = [_parse_contact_row(row) for row in rows]
+    _contacts_cache["mtime"] = CSV_PATH.stat().st_mtime_ns
 
 
-def run_adb_command(command):
-    """ADBコマンドを実行"""
+def save_contacts(contacts):
+    """CSVに連絡先を保存"""
+    with _contacts_lock:
+        _write_contacts(contacts)
+
+
+def run_adb_command(args, serial=None):
+    """ADBコマンドを実行（args は引数リスト、serial 指定時はそのデバイスに対して実行）"""
     config = load_config()
     adb_path = config.get('adb_path', 'adb')
-    full_command = f'"{adb_path}" {command}'
+    argv = [adb_path, '-s', serial, *args] if serial else [adb_path, *args]
     
     try:
         result = subprocess.run(
-            full_command,
-            shell=True,
+            argv,
+            shell=False,
             capture_output=True,
             text=True,
             timeout=30
@@ -126,34 +324,185 @@ def run_adb_command(command):
         return False, "", str(e)
 
 
+class AdbShell:
+    """常駐する adb shell セッション
+
+    コマンドごとに adb を起動せず、1つの `adb shell` に標準入力からコマンドを流し込み、
+    センチネル行が返ってくるまで出力を読む。
+    TIMEOUT 秒以内に終わらない場合はプロセスを終了し、セッションを破棄する。
+    """
+
+    TIMEOUT = 30
+
+    def __init__(self, adb_path, serial=None):
+        self.adb_path = adb_path
+        self.serial = serial
+        self._seq = 0
+        self._lock = threading.Lock()
+        argv = [adb_path, "-s", serial, "shell"] if serial else [adb_path, "shell"]
+        self._proc = subprocess.Popen(
+            argv,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT
+        )
+        # Windows でも改行を \r\n に変換しない（SMS本文に \r が混ざるのを防ぐ）
+        self._stdin = io.TextIOWrapper(self._proc.stdin, encoding='utf-8', newline='\n', write_through=True)
+        # 出力は別スレッドで1行ずつキューに積み、run() は期限付きで待つ
+        self._lines = queue.Queue()
+        reader = threading.Thread(target=self._read_output, daemon=True)
+        reader.start()
+
+    def _read_output(self):
+        stdout = io.TextIOWrapper(self._proc.stdout, encoding='utf-8', errors='replace')
+        for line in stdout:
+            self._lines.put(line)
+        self._lines.put(None)  # EOF
+
+    def is_alive(self):
+        return self._proc.poll() is None
+
+    def run(self, cmd):
+        """デバイス側でコマンドを実行し (成功, 出力, エラー) を返す"""
+        with self._lock:
+            self._seq += 1
+            sentinel = f"__DONE_{self._seq}__"
+            deadline = time.monotonic() + self.TIMEOUT
+            try:
+                self._stdin.write(f"{cmd}; echo {sentinel} $?\n")
+                self._stdin.flush()
+                output = []
+                while True:
+                    try:
+                        line = self._lines.get(timeout=max(deadline - time.monotonic(), 0))
+                    except queue.Empty:
+                        # 応答がないセッションは再利用しない
+                        self._proc.kill()
+                        discard_adb_shell(self)
+                        return False, "", "timeout"
+                    if line is None:
+                        return False, "".join(output), "adb shell terminated"
+                    # 末尾に改行のない出力の直後にセンチネルが続く場合もある
+                    pos = line.find(sentinel)
+                    if pos >= 0:
+                        output.append(line[:pos])
+                        returncode = line[pos + len(sentinel):].strip()
+                        out = "".join(output)
+                        if returncode == '0':
+                            return True, out, ""
+                        return False, out, out or f"exit status {returncode}"
+                    output.append(line)
+            except Exception as e:
+                return False, "", str(e)
+
+    def close(self):
+        try:
+            self._stdin.write("exit\n")
+            self._stdin.flush()
+            self._proc.wait(timeout=5)
+        except Exception:
+            self._proc.kill()
+
+
+# デバイスごとの常駐 adb shell（キー: シリアル、None は既定のデバイス）
+_adb_shells = {}
+_adb_shell_lock = threading.Lock()
+
+
+def get_adb_shell(serial=None):
+    """常駐 adb shell を取得（未起動・終了済み・パス変更時は起動し直す）"""
+    adb_path = load_config().get('adb_path', 'adb')
+    with _adb_shell_lock:
+        shell = _adb_shells.get(serial)
+        if shell is None or not shell.is_alive() or shell.adb_path != adb_path:
+            if shell is not None:
+                shell.close()
+            shell = AdbShell(adb_path, serial)
+            _adb_shells[serial] = shell
+        return shell
+
+
+def discard_adb_shell(shell):
+    """常駐 adb shell を一覧から外す（次回の get_adb_shell で起動し直す）"""
+    with _adb_shell_lock:
+        if _adb_shells.get(shell.serial) is shell:
+            del _adb_shells[shell.serial]
+
+
 def check_device():
     """デバイス接続確認"""
-    success, stdout, stderr = run_adb_command("devices")
+    success, stdout, stderr = run_adb_command(["devices"])
     if not success:
-        return False, "ADBが実行できません", None
+        return False, "ADBが実行できません", []
     
     lines = stdout.strip().split('\n')
-    devices = [l for l in lines[1:] if l.strip() and 'device' in l]
+    # 状態列が "device" のものだけ（unauthorized / offline / no permissions は除く）
+    devices = [l for l in lines[1:] if '\t' in l and l.split('\t')[1].strip() == 'device']
     
     if not devices:
-        return False, "デバイスが接続されていません", None
+        return False, "デバイスが接続されていません", []
     
-    device_id = devices[0].split()[0]
-    return True, f"接続済み: {device_id}", device_id
+    device_ids = [d.split()[0] for d in devices]
+    return True, f"接続済み: {', '.join(device_ids)}", device_ids
+
+
+class CommandBundle:
+    """送信1回分の設定から組み立てた adb shell コマンド
+
+    送信中は設定が変わらない前提で、send_all_sms の開始時に1度だけ作る。
+    """
+
+    INTENT_PREFIX = "am start -a android.intent.action.SENDTO -d "
+
+    def __init__(self, config):
+        # 送信方法を取得（設定から）
+        send_method = config.get('send_method', 'tap')
+        tap_x = config.get('send_button_x', 980)
+        tap_y = config.get('send_button_y', 1850)
+        
+        # 一連の入力操作は1つのスクリプトにまとめて1往復で実行する
+        # （待機もデバイス側の sleep で行う）
+        tap_cmd = f"input tap {tap_x} {tap_y}"
+        if send_method == 'tap':
+            # 画面タップで送信ボタンを押す → もう一度タップ（確認ダイアログ対応）
+            steps = [tap_cmd, "sleep 1", tap_cmd]
+        elif send_method == 'key':
+            # キーイベントで送信（Enter ×2）
+            steps = ["input keyevent 66", "sleep 0.5", "input keyevent 66"]
+        elif send_method == 'tab_enter':
+            # Tabで送信ボタンにフォーカス→Enter
+            steps = ["input keyevent 61", "sleep 0.3", "input keyevent 61", "sleep 0.3", "input keyevent 66"]
+        else:
+            steps = []
+        
+        # ホームに戻る
+        steps += ["sleep 2", "input keyevent 3"]
+        self.send_script = "; ".join(steps)
 
+    def intent(self, phone, message):
+        """SMSアプリを起動するインテントのコマンド"""
+        return f"{self.INTENT_PREFIX}{shlex.quote('sms:' + phone)} --es sms_body {shlex.quote(message)}"
 
-def send_sms(phone, message, dry_run=False):
-    """SMS送信"""
+
+def send_sms(phone, message, dry_run=False, serial=None, commands=None):
+    """SMS送信（serial 指定時はそのデバイスから送信）
+
+    commands は送信開始時に作った CommandBundle。省略時は現在の設定から作る。
+    """
     if dry_run:
         time.sleep(0.5)
         return True, "Dry run OK"
     
-    config = load_config()
-    
+    if commands is None:
+        commands = CommandBundle(load_config())
+
+    try:
+        shell = get_adb_shell(serial)
+    except Exception as e:
+        return False, f"Launch failed: {e}"
+
     # インテントでSMSアプリを起動
-    escaped_message = message.replace('"', '\\"').replace("'", "\\'")
-    intent_cmd = f'shell am start -a android.intent.action.SENDTO -d "sms:{phone}" --es sms_body "{escaped_message}"'
-    success, stdout, stderr = run_adb_command(intent_cmd)
+    success, stdout, stderr = shell.run(commands.intent(phone, message))
     
     if not success:
         return False, f"Launch failed: {stderr}"
@@ -161,38 +510,119 @@ def send_sms(phone, message, dry_run=False):
     # アプリ起動を待つ
     time.sleep(3)
     
-    # 送信方法を取得（設定から）
-    send_method = config.get('send_method', 'tap')
-    tap_x = config.get('send_button_x', 980)
-    tap_y = config.get('send_button_y', 1850)
-    
-    if send_method == 'tap':
-        # 画面タップで送信ボタンを押す
-        run_adb_command(f"shell input tap {tap_x} {tap_y}")
-        time.sleep(1)
-        # もう一度タップ（確認ダイアログ対応）
-        run_adb_command(f"shell input tap {tap_x} {tap_y}")
-    elif send_method == 'key':
-        # キーイベントで送信
-        run_adb_command("shell input keyevent 66")  # Enter
-        time.sleep(0.5)
-        run_adb_command("shell input keyevent 66")  # Enter again
-    elif send_method == 'tab_enter':
-        # Tabで送信ボタンにフォーカス→Enter
-        run_adb_command("shell input keyevent 61")  # Tab
-        time.sleep(0.3)
-        run_adb_command("shell input keyevent 61")  # Tab
-        time.sleep(0.3)
-        run_adb_command("shell input keyevent 66")  # Enter
-    
-    time.sleep(2)
-    
-    # ホームに戻る
-    run_adb_command("shell input keyevent 3")  # Home
+    # 送信操作 → ホームに戻る
+    shell.run(commands.send_script)
     
     return True, "Sent"
 
 
+# ログファイル名の一覧（新しい順）。初回参照時に作成し、以降は書き込み・削除時に更新する
+_log_index = None
+_log_index_lock = threading.Lock()
+
+
+def is_log_file(name):
+    """送信ログ本体のファイル名か（JSONL と旧形式の JSON、サマリーは除く）"""
+    if name.endswith('.summary.json'):
+        return False
+    return name.endswith('.jsonl') or name.endswith('.json')
+
+
+def get_log_index():
+    """ログファイル名の一覧を新しい順で取得"""
+    global _log_index
+    with _log_index_lock:
+        if _log_index is None:
+            names = [f.name for f in LOG_DIR.glob('sms_log_*') if is_log_file(f.name)]
+            _log_index = sorted(names, reverse=True)
+        return list(_log_index)
+
+
+def add_to_log_index(name):
+    """ログ一覧の先頭に追加"""
+    with _log_index_lock:
+        if _log_index is not None and name not in _log_index:
+            _log_index.insert(0, name)
+
+
+def remove_from_log_index(name):
+    """ログ一覧から削除"""
+    with _log_index_lock:
+        if _log_index is not None and name in _log_index:
+            _log_index.remove(name)
+
+
+def reset_log_index(names=None):
+    """ログ一覧を置き換える（None の場合は次回参照時に作り直す）"""
+    global _log_index
+    with _log_index_lock:
+        _log_index = names
+
+
+def summary_path(log_file):
+    """ログファイルに対応するサマリーファイルのパス"""
+    return log_file.with_suffix('.summary.json')
+
+
+def read_log_file(log_file):
+    """ログファイルを読み込む（JSONL は旧形式と同じ1つのdictに組み立てる）"""
+    with open(log_file, 'r', encoding='utf-8') as f:
+        if log_file.suffix != '.jsonl':
+            return _loads(f.read())
+        data = {}
+        results = []
+        for line in f:
+            if not line.strip():
+                continue
+            record = _loads(line)
+            if 'meta' in record:
+                data.update(record['meta'])
+            elif 'trailer' in record:
+                data.update(record['trailer'])
+            else:
+                results.append(record)
+    data['results'] = results
+    return data
+
+
+# ログのサマリーキャッシュ（キー: ログファイル名、値: (読み込み元のmtime, サマリー)）
+_log_summary_cache = {}
+
+
+def _log_summary_source(log_file):
+    """サマリーの読み込み元（サマリーファイル、なければログ本体）とそのmtime"""
+    summary_file = summary_path(log_file)
+    try:
+        return summary_file, os.stat(summary_file).st_mtime_ns
+    except FileNotFoundError:
+        return log_file, os.stat(log_file).st_mtime_ns
+
+
+def read_log_summary(log_file):
+    """ログのサマリーを取得（サマリーファイルがない古いログは本体から集計）
+
+    読み込み元ファイルの mtime が変わっていなければキャッシュを返す。
+    """
+    source, mtime = _log_summary_source(log_file)
+    cached = _log_summary_cache.get(log_file.name)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    
+    if source == log_file:
+        data = read_log_file(log_file)
+        data = {
+            "start_time": data.get("start_time"),
+            "total": data.get("total", 0),
+            "success": sum(1 for r in data.get("results", []) if r.get("success")),
+            "failed": sum(1 for r in data.get("results", []) if not r.get("success"))
+        }
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            data = _loads(f.read())
+    _log_summary_cache[log_file.name] = (mtime, data)
+    return data
+
+
 def send_all_sms(dry_run=False):
     """全SMS送信（バックグラウンド実行）"""
     global send_status
@@ -200,6 +630,7 @@ def send_all_sms(dry_run=False):
     config = load_config()
     contacts = [c for c in load_contacts() if c.get('enabled', True)]
     default_message = config.get('default_message', '')
+    commands = CommandBundle(config)
     delay = config.get('send_delay_seconds', 5)
     max_count = config.get('max_send_count', 0)  # 0 = unlimited
     
@@ -230,49 +661,108 @@ def send_all_sms(dry_run=False):
         # 送信対象を制限
         contacts = contacts[:remaining]
     
+    # 前回の送信で読まれずに残ったログ（終了通知を含む）を捨てる
+    while True:
+        try:
+            log_queue.get_nowait()
+        except queue.Empty:
+            break
+    
     send_status = {
         "is_running": True,
         "current": 0,
         "total": len(contacts),
+        "success": 0,
+        "failed": 0,
         "results": [],
+        "results_offset": 0,
         "start_time": datetime.now().isoformat(),
         "max_count": max_count,
         "daily_sent_before": daily_sent
     }
     
-    LOG_DIR.mkdir(exist_ok=True)
-    log_file = LOG_DIR / f"sms_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    # ログは JSONL で1件ずつ追記する（先頭行: meta、各結果、最終行: trailer）
+    # メモリ上には直近 RESULTS_LIMIT 件だけ残す
+    log_file = LOG_DIR / f"sms_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+    log_f = open(log_file, 'w', encoding='utf-8', buffering=1)
+    log_f.write(_dumps({"meta": {
+        "start_time": send_status["start_time"],
+        "total": send_status["total"],
+        "max_count": max_count,
+        "daily_sent_before": daily_sent
+    }}) + "\n")
+    add_to_log_index(log_file.name)
     
     sent_count = 0
     
-    for i, contact in enumerate(contacts):
-        if not send_status["is_running"]:
-            break
-        
-        send_status["current"] = i + 1
-        message = contact['message'] or default_message
-        
-        log_entry = {
-            "index": i + 1,
-            "phone": contact['phone'],
-            "name": contact['name'],
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        success, result = send_sms(contact['phone'], message, dry_run)
-        log_entry["success"] = success
-        log_entry["result"] = result
-        
-        send_status["results"].append(log_entry)
-        log_queue.put(log_entry)
-        
-        if success:
-            sent_count += 1
-        
-        if i < len(contacts) - 1 and send_status["is_running"]:
-            time.sleep(delay)
+    def send_queue(items, serial):
+        """1台のデバイスに割り当てた連絡先を順に送信"""
+        nonlocal sent_count
+        for n, (i, contact) in enumerate(items):
+            if not send_status["is_running"]:
+                break
+            
+            with send_status_lock:
+                send_status["current"] += 1
+            message = contact['message'] or default_message
+            
+            log_entry = {
+                "index": i + 1,
+                "phone": contact['phone'],
+                "name": contact['name'],
+                "timestamp": datetime.now().isoformat()
+            }
+            if serial:
+                log_entry["device"] = serial
+            
+            success, result = send_sms(contact['phone'], message, dry_run, serial, commands)
+            log_entry["success"] = success
+            log_entry["result"] = result
+            
+            with send_status_lock:
+                log_f.write(_dumps(log_entry) + "\n")
+                send_status["results"].append(log_entry)
+                if len(send_status["results"]) > RESULTS_LIMIT:
+                    del send_status["results"][0]
+                    send_status["results_offset"] += 1
+                if success:
+                    sent_count += 1
+                    send_status["success"] += 1
+                else:
+                    send_status["failed"] += 1
+            put_log(log_entry)
+            put_log({
+                "type": "progress",
+                "is_running": True,
+                "current": send_status["current"],
+                "total": send_status["total"]
+            })
+            
+            if n < len(items) - 1 and send_status["is_running"]:
+                time.sleep(delay)
+    
+    # 接続中のデバイスに連絡先をラウンドロビンで振り分けて並列送信
+    serials = [None]
+    if not dry_run:
+        connected, _, device_ids = check_device()
+        if connected:
+            serials = device_ids
+    indexed = list(enumerate(contacts))
+    queues = [indexed[k::len(serials)] for k in range(len(serials))]
+    
+    if len(serials) == 1:
+        send_queue(queues[0], serials[0])
+    else:
+        with ThreadPoolExecutor(max_workers=len(serials)) as executor:
+            list(executor.map(send_queue, queues, serials))
     
     send_status["is_running"] = False
+    put_log({
+        "type": "progress",
+        "is_running": False,
+        "current": send_status["current"],
+        "total": send_status["total"]
+    })
     
     # 日次カウントを更新（ドライラン以外）
     if not dry_run:
@@ -281,9 +771,20 @@ def send_all_sms(dry_run=False):
         config['daily_sent_date'] = today
         save_config(config)
     
-    # ログファイル保存
-    with open(log_file, 'w', encoding='utf-8') as f:
-        json.dump(send_status, f, ensure_ascii=False, indent=2)
+    # ログの最終行に送信後の状態を書いて閉じる
+    log_f.write(_dumps({"trailer": {
+        k: v for k, v in send_status.items() if k not in ('results', 'results_offset')
+    }}) + "\n")
+    log_f.close()
+    
+    # 一覧表示用のサマリーを別ファイルに保存
+    with open(summary_path(log_file), 'w', encoding='utf-8') as f:
+        f.write(_dumps({
+            "start_time": send_status["start_time"],
+            "total": send_status["total"],
+            "success": send_status["success"],
+            "failed": send_status["failed"]
+        }))
 
 
 # ===== ルーティング =====
@@ -307,8 +808,13 @@ def api_config():
 
 @app.route('/api/contacts', methods=['GET'])
 def api_get_contacts():
-    """連絡先一覧取得"""
-    return jsonify(load_contacts())
+    """連絡先一覧取得（contacts.csv の mtime を ETag にする）"""
+    try:
+        st = CSV_PATH.stat()
+        etag = f"{st.st_mtime_ns:x}-{st.st_size:x}"
+    except FileNotFoundError:
+        etag = None
+    return conditional_json(etag, load_contacts)
 
 
 @app.route('/api/contacts', methods=['POST'])
@@ -316,32 +822,34 @@ def api_add_contact():
     """連絡先追加"""
     contacts = load_contacts()
     new_contact = request.json
-    new_contact['id'] = len(contacts)
+    new_contact['id'] = _new_contact_id()
     contacts.append(new_contact)
     save_contacts(contacts)
     return jsonify({"success": True, "contact": new_contact})
 
 
-@app.route('/api/contacts/<int:contact_id>', methods=['PUT'])
+@app.route('/api/contacts/<contact_id>', methods=['PUT'])
 def api_update_contact(contact_id):
     """連絡先更新"""
     contacts = load_contacts()
+    updates = dict(request.json)
+    updates.pop('id', None)
     for c in contacts:
         if c['id'] == contact_id:
-            c.update(request.json)
+            c.update(updates)
             break
     save_contacts(contacts)
     return jsonify({"success": True})
 
 
-@app.route('/api/contacts/<int:contact_id>', methods=['DELETE'])
+@app.route('/api/contacts/<contact_id>', methods=['DELETE'])
 def api_delete_contact(contact_id):
-    """連絡先削除"""
+    """連絡先削除
+
+    呼び出しごとにCSVを書き直すため、複数件の削除は /api/contacts/bulk を使う。
+    """
     contacts = load_contacts()
     contacts = [c for c in contacts if c['id'] != contact_id]
-    # IDを振り直す
-    for i, c in enumerate(contacts):
-        c['id'] = i
     save_contacts(contacts)
     return jsonify({"success": True})
 
@@ -350,7 +858,7 @@ def api_delete_contact(contact_id):
 def api_bulk_contacts():
     """連絡先一括操作"""
     action = request.json.get('action')
-    ids = request.json.get('ids', [])
+    ids = set(request.json.get('ids', []))
     contacts = load_contacts()
     
     if action == 'enable':
@@ -363,8 +871,6 @@ def api_bulk_contacts():
                 c['enabled'] = False
     elif action == 'delete':
         contacts = [c for c in contacts if c['id'] not in ids]
-        for i, c in enumerate(contacts):
-            c['id'] = i
     
     save_contacts(contacts)
     return jsonify({"success": True})
@@ -377,23 +883,31 @@ def api_import_contacts():
         return jsonify({"success": False, "error": "ファイルがありません"})
     
     file = request.files['file']
-    content = file.read().decode('utf-8')
-    
     contacts = load_contacts()
-    lines = [l for l in content.split('\n') if l.strip() and not l.startswith('#')]
     
-    if lines:
-        reader = csv.DictReader(lines)
+    # 大きなファイルは pandas で一括解析
+    if pd is not None and (request.content_length or 0) > PANDAS_IMPORT_THRESHOLD:
+        df = _read_contacts_frame(file.stream)
+        if df is not None:
+            imported = _frame_to_contacts(df[df['phone'] != ''], keep_ids=False)
+            contacts.extend(imported)
+            save_contacts(contacts)
+            return jsonify({"success": True, "imported": len(imported)})
+        file.stream.seek(0)
+    
+    # Python 3.10 以前の SpooledTemporaryFile は readable() を持たず TextIOWrapper で包めないため、
+    # バイナリのまま1行ずつデコードする
+    lines = (b.decode('utf-8') for b in file.stream)
+    reader = csv.DictReader(l for l in lines if l.strip() and not l.startswith('#'))
+    
+    if reader.fieldnames:
         imported = 0
         for row in reader:
             if row.get('phone'):
-                contacts.append({
-                    'id': len(contacts),
-                    'phone': row.get('phone', '').strip(),
-                    'name': row.get('name', '').strip(),
-                    'message': row.get('message', '').strip(),
-                    'enabled': row.get('enabled', '1').strip() == '1'
-                })
+                # インポート元のIDは引き継がず、新しいIDを振る
+                contact = _parse_contact_row(row)
+                contact['id'] = _new_contact_id()
+                contacts.append(contact)
                 imported += 1
         
         save_contacts(contacts)
@@ -404,22 +918,26 @@ def api_import_contacts():
 
 @app.route('/api/contacts/export')
 def api_export_contacts():
-    """CSVエクスポート"""
+    """CSVエクスポート（1行ずつ生成して送る）"""
     contacts = load_contacts()
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=['phone', 'name', 'message', 'enabled'])
-    writer.writeheader()
-    for c in contacts:
-        writer.writerow({
-            'phone': c['phone'],
-            'name': c['name'],
-            'message': c['message'],
-            'enabled': '1' if c.get('enabled', True) else '0'
-        })
     
-    output.seek(0)
+    def generate():
+        # 1行分だけのバッファを使い回し、クォート処理は csv.writer に任せる
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        
+        def row(values):
+            buf.seek(0)
+            buf.truncate()
+            writer.writerow(values)
+            return buf.getvalue()
+        
+        yield row(['phone', 'name', 'message', 'enabled'])
+        for c in contacts:
+            yield row([c['phone'], c['name'], c['message'], '1' if c.get('enabled', True) else '0'])
+    
     return Response(
-        output.getvalue(),
+        generate(),
         mimetype='text/csv',
         headers={"Content-Disposition": f"attachment;filename=contacts_{datetime.now().strftime('%Y%m%d')}.csv"}
     )
@@ -428,11 +946,12 @@ def api_export_contacts():
 @app.route('/api/device/check')
 def api_check_device():
     """デバイス接続確認"""
-    connected, message, device_id = check_device()
+    connected, message, device_ids = check_device()
     return jsonify({
         "connected": connected,
         "message": message,
-        "device_id": device_id
+        "device_id": device_ids[0] if device_ids else None,
+        "device_ids": device_ids
     })
 
 
@@ -442,7 +961,7 @@ def api_test_tap():
     x = request.json.get('x', 980)
     y = request.json.get('y', 1850)
     
-    success, stdout, stderr = run_adb_command(f"shell input tap {x} {y}")
+    success, stdout, stderr = run_adb_command(["shell", "input", "tap", str(x), str(y)])
     
     return jsonify({
         "success": success,
@@ -453,7 +972,7 @@ def api_test_tap():
 @app.route('/api/screen/size')
 def api_screen_size():
     """画面サイズを取得"""
-    success, stdout, stderr = run_adb_command("shell wm size")
+    success, stdout, stderr = run_adb_command(["shell", "wm", "size"])
     if success and 'Physical size:' in stdout:
         # "Physical size: 1080x2400" のような形式
         size_str = stdout.split('Physical size:')[1].strip()
@@ -469,30 +988,18 @@ def api_screen_size():
 
 @app.route('/api/screen/screenshot')
 def api_screenshot():
-    """スクリーンショットを取得"""
-    import base64
-    
-    # スクリーンショットを撮影してbase64で返す
-    run_adb_command("shell screencap -p /sdcard/screenshot.png")
-    success, stdout, stderr = run_adb_command("exec-out cat /sdcard/screenshot.png")
+    """スクリーンショットを取得（PNGをそのまま返す）"""
+    try:
+        result = subprocess.run(
+            [load_config().get("adb_path", "adb"), "exec-out", "screencap", "-p"],
+            capture_output=True,
+            timeout=30
+        )
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)})
     
-    if success:
-        # バイナリデータを取得
-        try:
-            result = subprocess.run(
-                f'"{load_config().get("adb_path", "adb")}" exec-out cat /sdcard/screenshot.png',
-                shell=True,
-                capture_output=True,
-                timeout=30
-            )
-            if result.returncode == 0:
-                img_base64 = base64.b64encode(result.stdout).decode('utf-8')
-                return jsonify({
-                    "success": True,
-                    "image": f"data:image/png;base64,{img_base64}"
-                })
-        except Exception as e:
-            return jsonify({"success": False, "error": str(e)})
+    if result.returncode == 0 and result.stdout:
+        return Response(result.stdout, mimetype='image/png')
     
     return jsonify({"success": False, "error": "Screenshot failed"})
 
@@ -525,43 +1032,79 @@ def api_stop_send():
 
 @app.route('/api/send/status')
 def api_send_status():
-    """送信状態取得"""
-    return jsonify(send_status)
+    """送信状態取得（結果一覧は含めない。/api/send/results で差分取得する）"""
+    return jsonify({k: v for k, v in send_status.items() if k not in ('results', 'results_offset')})
+
+
+@app.route('/api/send/results')
+def api_send_results():
+    """送信結果の差分取得（since 件目以降を返す）
+
+    メモリ上には直近 RESULTS_LIMIT 件しか残らないため、それより古い分は返らない。
+    next を次回の since に使う。
+    """
+    since = request.args.get('since', 0, type=int)
+    with send_status_lock:
+        offset = send_status.get("results_offset", 0)
+        results = send_status["results"][max(since - offset, 0):]
+    return jsonify({
+        "start_time": send_status.get("start_time"),
+        "results": results,
+        "next": max(since, offset) + len(results)
+    })
 
 
 @app.route('/api/send/stream')
 def api_send_stream():
-    """送信ログのSSE配信"""
+    """送信ログのSSE配信（送信が終わりキューが空になったら閉じる）"""
     def generate():
         while True:
             try:
-                entry = log_queue.get(timeout=1)
-                yield f"data: {json.dumps(entry, ensure_ascii=False)}\n\n"
+                entry = log_queue.get(timeout=15)
             except queue.Empty:
-                yield f"data: {json.dumps({'ping': True})}\n\n"
+                # 接続維持用のコメント行
+                yield ": keepalive\n\n"
+                continue
+            yield f"data: {_dumps(entry)}\n\n"
+            
+            # 送信終了の通知を流し終え、送信中でなければ閉じる
+            if (entry.get("type") == "progress" and not entry.get("is_running")
+                    and not send_status["is_running"] and log_queue.empty()):
+                return
     
     return Response(generate(), mimetype='text/event-stream')
 
 
 @app.route('/api/logs')
 def api_get_logs():
-    """ログ一覧取得"""
-    logs = []
+    """ログ一覧取得（表示する各ログのファイル名とmtimeから ETag を作る）"""
+    entries = []
     if LOG_DIR.exists():
-        for f in sorted(LOG_DIR.glob('*.json'), reverse=True)[:20]:
+        for name in get_log_index()[:20]:
             try:
-                with open(f, 'r', encoding='utf-8') as file:
-                    data = json.load(file)
-                    logs.append({
-                        "filename": f.name,
-                        "start_time": data.get("start_time"),
-                        "total": data.get("total", 0),
-                        "success": sum(1 for r in data.get("results", []) if r.get("success")),
-                        "failed": sum(1 for r in data.get("results", []) if not r.get("success"))
-                    })
+                entries.append((name, _log_summary_source(LOG_DIR / name)[1]))
+            except OSError:
+                pass
+    etag = hashlib.sha1(repr(entries).encode('utf-8')).hexdigest()
+    
+    def build():
+        logs = []
+        for name, _ in entries:
+            f = LOG_DIR / name
+            try:
+                summary = read_log_summary(f)
+                logs.append({
+                    "filename": f.name,
+                    "start_time": summary.get("start_time"),
+                    "total": summary.get("total", 0),
+                    "success": summary.get("success", 0),
+                    "failed": summary.get("failed", 0)
+                })
             except:
                 pass
-    return jsonify(logs)
+        return logs
+    
+    return conditional_json(etag, build)
 
 
 @app.route('/api/logs/<filename>')
@@ -569,8 +1112,7 @@ def api_get_log_detail(filename):
     """ログ詳細取得"""
     log_file = LOG_DIR / filename
     if log_file.exists():
-        with open(log_file, 'r', encoding='utf-8') as f:
-            return jsonify(json.load(f))
+        return jsonify(read_log_file(log_file))
     return jsonify({"error": "Log not found"}), 404
 
 
@@ -585,6 +1127,11 @@ def api_delete_log(filename):
     if log_file.exists():
         try:
             os.remove(log_file)
+            summary_file = summary_path(log_file)
+            if summary_file.exists():
+                os.remove(summary_file)
+            remove_from_log_index(filename)
+            _log_summary_cache.pop(filename, None)
             return jsonify({"success": True})
         except Exception as e:
             return jsonify({"success": False, "error": str(e)}), 500
@@ -597,11 +1144,18 @@ def api_clear_all_logs():
     try:
         deleted = 0
         if LOG_DIR.exists():
-            for f in LOG_DIR.glob('*.json'):
+            for f in LOG_DIR.glob('sms_log_*'):
+                if not (is_log_file(f.name) or f.name.endswith('.summary.json')):
+                    continue
                 os.remove(f)
-                deleted += 1
+                if is_log_file(f.name):
+                    deleted += 1
+        reset_log_index([])
+        _log_summary_cache.clear()
         return jsonify({"success": True, "deleted": deleted})
     except Exception as e:
+        # 途中で失敗した場合は次回の参照時に一覧を作り直す
+        reset_log_index()
         return jsonify({"success": False, "error": str(e)}), 500
 
 
@@ -636,7 +1190,6 @@ def api_reset_daily_count():
 
 
 if __name__ == '__main__':
-    LOG_DIR.mkdir(exist_ok=True)
     print("\n" + "="*50)
     print("  SMS送信システム ダッシュボード")
     print("  http://localhost:5000 でアクセス")